@@ -3,17 +3,141 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
+import warnings
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sklearn.preprocessing import StandardScaler, RobustScaler
-from sklearn.impute import SimpleImputer
 import psycopg2
-from sqlalchemy import create_engine
+from psycopg2.extras import execute_values
+from sqlalchemy import create_engine, event
 import redis
 import json
+import zlib
+import msgpack
+import pyarrow as pa
+from pyarrow import feather
+
+from rolling_kernels import WINDOW_STATS, compute_all_stats, fill_gaps, roll_mean, roll_std
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sensor readings are sampled every 5 minutes
+SAMPLE_INTERVAL = pd.Timedelta(minutes=5)
+
+# Sensor accuracy is at most ~3 significant digits, so features are float32
+FEATURE_DTYPE = np.float32
+
+# Cyclical encodings, indexed by hour (0-23), day of week (0-6) and month - 1
+HOUR_SIN = np.sin(2 * np.pi * np.arange(24) / 24).astype(FEATURE_DTYPE)
+HOUR_COS = np.cos(2 * np.pi * np.arange(24) / 24).astype(FEATURE_DTYPE)
+DAY_SIN = np.sin(2 * np.pi * np.arange(7) / 7).astype(FEATURE_DTYPE)
+DAY_COS = np.cos(2 * np.pi * np.arange(7) / 7).astype(FEATURE_DTYPE)
+MONTH_SIN = np.sin(2 * np.pi * np.arange(1, 13) / 12).astype(FEATURE_DTYPE)
+MONTH_COS = np.cos(2 * np.pi * np.arange(1, 13) / 12).astype(FEATURE_DTYPE)
+
+# Bit masks over day of week / hour of day
+WEEKEND_MASK = (1 << 5) | (1 << 6)
+NIGHT_MASK = sum(1 << h for h in list(range(22, 24)) + list(range(0, 6)))
+FEEDING_MASK = sum(1 << h for h in [8, 12, 18])  # Typical feeding hours
+
+# Seasons (Northern Hemisphere), indexed by month - 1
+SEASONS = ['winter', 'spring', 'summer', 'autumn']
+MONTH_SEASON = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0], dtype=np.int8)
+
+# Temperature season adjustment, indexed by month - 1
+TEMP_SEASON_FACTOR = np.array([
+    0.1, 0.3,            # Winter - lower temps expected
+    0.6, 0.8, 0.9,       # Spring - rising temps
+    1.0, 1.0, 1.0,       # Summer - peak temps
+    0.8, 0.6, 0.4,       # Autumn - falling temps
+    0.2                  # Winter
+], dtype=FEATURE_DTYPE)
+
+def _window_periods(window: str) -> int:
+    """Translate a time window such as '3H' into a number of samples"""
+    return max(int(pd.Timedelta(window) // SAMPLE_INTERVAL), 1)
+
+# Z-score anomaly features are taken over a 24 hour window
+ZSCORE_PERIODS = _window_periods('24h')
+
+# Columns extracted for every sensor reading
+READINGS_SELECT = """
+        SELECT 
+            r.time,
+            r.sensor_id,
+            r.tank_id,
+            r.sensor_type,
+            r.value,
+            r.quality_score,
+            s.model,
+            s.manufacturer,
+            s.accuracy,
+            s.min_value,
+            s.max_value
+        FROM sensor_data.readings r
+        JOIN sensor_data.sensors s ON r.sensor_id = s.id"""
+
+# Statements prepared on every database connection, run with EXECUTE name(...)
+PREPARED_STATEMENTS = {
+    'extract_readings': READINGS_SELECT + """
+        WHERE r.tank_id = $1
+        AND r.time BETWEEN $2 AND $3
+        AND r.quality_score >= 0.7
+        AND r.sensor_type = ANY($4)
+        ORDER BY r.time, r.sensor_type
+        """,
+    'tank_metadata': """
+        SELECT 
+            capacity_value,
+            capacity_unit,
+            tank_type,
+            location,
+            optimal_parameters
+        FROM sensor_data.tanks
+        WHERE id = $1
+        """
+}
+
+# Readings are fetched in chunks of this many rows, with compact numeric dtypes
+READINGS_CHUNK_SIZE = 50000
+READINGS_DTYPES = {
+    'value': 'float32',
+    'quality_score': 'float32',
+    'accuracy': 'float32',
+    'min_value': 'float32',
+    'max_value': 'float32'
+}
+
+def _prepare_statements(dbapi_connection, connection_record):
+    """Prepare PREPARED_STATEMENTS on a new database connection"""
+    with dbapi_connection.cursor() as cursor:
+        for name, statement in PREPARED_STATEMENTS.items():
+            cursor.execute(f"PREPARE {name} AS {statement}")
+    dbapi_connection.commit()
+
+def _stable_hash(value: Optional[str]) -> int:
+    """Process-independent string hash (CRC32); empty values hash to 0"""
+    return zlib.crc32(value.encode('utf-8')) if value else 0
+
+def _jsonb_dict(value) -> Dict:
+    """JSONB column value as a dict; psycopg2 already decodes JSONB, text needs parsing"""
+    if not value:
+        return {}
+    if isinstance(value, (str, bytes)):
+        return json.loads(value)
+    return value
+
+def _serialize_features(df: pd.DataFrame) -> bytes:
+    """Serialize a feature frame to LZ4-compressed Feather (Arrow IPC) bytes"""
+    sink = pa.BufferOutputStream()
+    feather.write_feather(df, sink, compression='lz4')
+    return sink.getvalue().to_pybytes()
+
+def _deserialize_features(payload: bytes) -> pd.DataFrame:
+    """Deserialize a feature frame written by _serialize_features"""
+    return feather.read_feather(pa.BufferReader(payload))
+
 @dataclass
 class FeatureConfig:
     """Configuration for feature engineering pipeline"""
@@ -23,6 +147,7 @@ class FeatureConfig:
     include_seasonal: bool = True
     include_lag_features: bool = True
     max_lag_hours: int = 6
+    max_workers: int = 16
     
     def __post_init__(self):
         if self.aggregation_windows is None:
@@ -38,18 +163,24 @@ class AquacultureFeatureEngineer:
         self.redis_config = redis_config
         self.config = feature_config
         
-        # Database connection
+        # Database connection, pooled for the batch worker threads
         self.engine = create_engine(
             f"postgresql://{db_config['user']}:{db_config['password']}@"
-            f"{db_config['host']}:{db_config['port']}/{db_config['database']}"
+            f"{db_config['host']}:{db_config['port']}/{db_config['database']}",
+            pool_size=feature_config.max_workers,
+            max_overflow=0
         )
         
-        # Redis connection for caching
+        # Prepare the hot per-tank queries on every new pooled connection so
+        # Postgres parses and plans them once per connection, not per call
+        event.listen(self.engine, 'connect', _prepare_statements)
+        
+        # Redis connection for caching (thread-safe, shared by batch workers)
         self.redis_client = redis.Redis(
             host=redis_config['host'],
             port=redis_config['port'],
             password=redis_config.get('password'),
-            decode_responses=True
+            decode_responses=False  # Cached values are binary Arrow / msgpack payloads
         )
         
         # Scalers for different feature types
@@ -62,267 +193,317 @@ class AquacultureFeatureEngineer:
         
         logger.info("Feature engineering pipeline initialized")
     
+    def _read_readings(self, query: str, params: Tuple) -> pd.DataFrame:
+        """Stream a readings query through a server-side cursor in chunks"""
+        with self.engine.connect().execution_options(
+            stream_results=True, 
+            max_row_buffer=READINGS_CHUNK_SIZE
+        ) as conn:
+            chunks = pd.read_sql_query(
+                query, 
+                conn, 
+                params=params,
+                parse_dates=['time'],
+                dtype=READINGS_DTYPES,
+                chunksize=READINGS_CHUNK_SIZE
+            )
+            return pd.concat(chunks, ignore_index=True)
+    
     def extract_sensor_data(self, tank_id: str, start_time: datetime, end_time: datetime) -> pd.DataFrame:
         """Extract sensor data for feature engineering"""
-        query = """
-        SELECT 
-            r.time,
-            r.sensor_id,
-            r.tank_id,
-            r.sensor_type,
-            r.value,
-            r.quality_score,
-            s.model,
-            s.manufacturer,
-            s.accuracy,
-            s.min_value,
-            s.max_value
-        FROM sensor_data.readings r
-        JOIN sensor_data.sensors s ON r.sensor_id = s.id
-        WHERE r.tank_id = %s
+        # A single tank's lookback window is small, so run the prepared
+        # statement directly (server-side cursors cannot DECLARE an EXECUTE)
+        df = pd.read_sql_query(
+            "EXECUTE extract_readings(%s, %s, %s, %s)", 
+            self.engine, 
+            params=(tank_id, start_time, end_time, list(self.config.sensor_types)),
+            parse_dates=['time'],
+            dtype=READINGS_DTYPES
+        )
+        
+        logger.info(f"Extracted {len(df)} sensor readings for tank {tank_id}")
+        return df
+    
+    def extract_sensor_data_batch(self, tank_ids: List[str], start_time: datetime, 
+                                  end_time: datetime) -> pd.DataFrame:
+        """Extract sensor data for several tanks in a single query"""
+        query = READINGS_SELECT + """
+        WHERE r.tank_id = ANY(%s)
         AND r.time BETWEEN %s AND %s
         AND r.quality_score >= 0.7
-        ORDER BY r.time, r.sensor_type
+        AND r.sensor_type = ANY(%s)
+        ORDER BY r.tank_id, r.time, r.sensor_type
         """
         
-        df = pd.read_sql_query(
+        df = self._read_readings(
             query, 
-            self.engine, 
-            params=[tank_id, start_time, end_time],
-            parse_dates=['time']
+            (list(tank_ids), start_time, end_time, list(self.config.sensor_types))
         )
         
-        logger.info(f"Extracted {len(df)} sensor readings for tank {tank_id}")
+        logger.info(f"Extracted {len(df)} sensor readings for {len(tank_ids)} tanks")
         return df
     
     def create_time_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Create time-based features"""
-        df = df.copy()
+        # Derive features once per distinct timestamp (readings of all sensor
+        # types share timestamps), then gather them back onto the rows
+        time_col = df['time']
+        if time_col.dt.tz is not None:
+            time_col = time_col.dt.tz_localize(None)
+        unique_times, inverse = np.unique(time_col.values, return_inverse=True)
         
         # Basic time features
-        df['hour'] = df['time'].dt.hour
-        df['day_of_week'] = df['time'].dt.dayofweek
-        df['month'] = df['time'].dt.month
-        df['quarter'] = df['time'].dt.quarter
-        
-        # Cyclical encoding for time features
-        df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-        df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-        df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-        df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-        
-        # Business logic features
-        df['is_weekend'] = df['day_of_week'].isin([5, 6])
-        df['is_night'] = df['hour'].isin(list(range(22, 24)) + list(range(0, 6)))
-        df['is_feeding_time'] = df['hour'].isin([8, 12, 18])  # Typical feeding hours
+        hour = unique_times.astype('datetime64[h]').astype(np.int64) % 24
+        day_of_week = (unique_times.astype('datetime64[D]').astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        month = unique_times.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        
+        time_features = {
+            'hour': hour.astype(np.int8),
+            'day_of_week': day_of_week.astype(np.int8),
+            'month': month.astype(np.int8),
+            'quarter': ((month - 1) // 3 + 1).astype(np.int8),
+            
+            # Cyclical encoding for time features
+            'hour_sin': HOUR_SIN[hour],
+            'hour_cos': HOUR_COS[hour],
+            'day_sin': DAY_SIN[day_of_week],
+            'day_cos': DAY_COS[day_of_week],
+            'month_sin': MONTH_SIN[month - 1],
+            'month_cos': MONTH_COS[month - 1],
+            
+            # Business logic features
+            'is_weekend': ((WEEKEND_MASK >> day_of_week) & 1).astype(bool),
+            'is_night': ((NIGHT_MASK >> hour) & 1).astype(bool),
+            'is_feeding_time': ((FEEDING_MASK >> hour) & 1).astype(bool),
+        }
         
         if self.config.include_seasonal:
-            # Seasonal features for aquaculture
-            df['season'] = df['month'].map({
-                12: 'winter', 1: 'winter', 2: 'winter',
-                3: 'spring', 4: 'spring', 5: 'spring',
-                6: 'summer', 7: 'summer', 8: 'summer',
-                9: 'autumn', 10: 'autumn', 11: 'autumn'
-            })
+            # Seasonal features for aquaculture, encoded as indices into SEASONS
+            time_features['season'] = MONTH_SEASON[month - 1]
             
             # Temperature season adjustment (Northern Hemisphere)
-            df['temp_season_factor'] = df['month'].map({
-                12: 0.2, 1: 0.1, 2: 0.3,  # Winter - lower temps expected
-                3: 0.6, 4: 0.8, 5: 0.9,   # Spring - rising temps
-                6: 1.0, 7: 1.0, 8: 1.0,   # Summer - peak temps
-                9: 0.8, 10: 0.6, 11: 0.4  # Autumn - falling temps
-            })
+            time_features['temp_season_factor'] = TEMP_SEASON_FACTOR[month - 1]
         
-        return df
+        time_features = pd.DataFrame(time_features).take(inverse.ravel()).set_axis(df.index)
+        
+        return pd.concat([df, time_features], axis=1)
+    
+    def create_sensor_grid(self, df: pd.DataFrame) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """Bin readings onto a regular SAMPLE_INTERVAL grid
+        
+        Returns the grid's time index and a float32 array of shape
+        (len(sensor_types), n_timesteps) holding each sensor type's mean
+        reading per bin, forward/back-filled across empty bins. Sensor types
+        without readings are left as all-NaN rows.
+        """
+        sensor_types = self.config.sensor_types
+        sensor_codes = pd.Categorical(df['sensor_type'], categories=sensor_types).codes.astype(np.int64)
+        values = df['value'].to_numpy(dtype=np.float64)
+        keep = (sensor_codes >= 0) & ~np.isnan(values)
+        
+        start = df['time'].min().floor(SAMPLE_INTERVAL)
+        bins = ((df['time'] - start) // SAMPLE_INTERVAL).to_numpy(dtype=np.int64)
+        n_timesteps = int(bins.max()) + 1
+        
+        # Group-and-reduce every (sensor type, bin) cell in one pass
+        flat_index = sensor_codes[keep] * n_timesteps + bins[keep]
+        size = len(sensor_types) * n_timesteps
+        sums = np.bincount(flat_index, weights=values[keep], minlength=size)
+        counts = np.bincount(flat_index, minlength=size)
+        
+        grid = np.full(size, np.nan, dtype=FEATURE_DTYPE)
+        observed = counts > 0
+        grid[observed] = sums[observed] / counts[observed]
+        grid = grid.reshape(len(sensor_types), n_timesteps)
+        fill_gaps(grid)
+        
+        time_index = pd.date_range(start, periods=n_timesteps, freq=SAMPLE_INTERVAL, name='time')
+        return time_index, grid
     
     def create_sensor_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """Create sensor-specific features"""
-        features_df = pd.DataFrame()
+        # Collect feature columns as arrays and build the frame once at the end
+        features = {}
         
-        for sensor_type in self.config.sensor_types:
-            sensor_data = df[df['sensor_type'] == sensor_type].copy()
-            if sensor_data.empty:
-                continue
-            
-            # Pivot to get sensor readings as columns
-            sensor_pivot = sensor_data.pivot_table(
-                index='time',
-                values='value',
-                aggfunc='mean'
-            ).fillna(method='ffill').fillna(method='bfill')
-            
-            if sensor_pivot.empty:
+        time_index, grid = self.create_sensor_grid(df)
+        
+        # Rolling stats for every sensor type and window in a single sweep
+        window_sizes = np.array(
+            [_window_periods(window) for window in self.config.aggregation_windows], 
+            dtype=np.int64
+        )
+        window_stats = compute_all_stats(grid, window_sizes)
+        
+        for sensor_idx, sensor_type in enumerate(self.config.sensor_types):
+            values = grid[sensor_idx]
+            if np.isnan(values).all():
                 continue
             
             sensor_name = sensor_type.lower()
+            sensor_values = pd.Series(values, index=time_index)
             
-            # Basic statistical features for different time windows
-            for window in self.config.aggregation_windows:
-                rolling = sensor_pivot.rolling(window)
-                
-                features_df[f'{sensor_name}_mean_{window}'] = rolling.mean()
-                features_df[f'{sensor_name}_std_{window}'] = rolling.std()
-                features_df[f'{sensor_name}_min_{window}'] = rolling.min()
-                features_df[f'{sensor_name}_max_{window}'] = rolling.max()
-                features_df[f'{sensor_name}_range_{window}'] = (
-                    rolling.max() - rolling.min()
-                )
-                
-                # Percentiles
-                features_df[f'{sensor_name}_q25_{window}'] = rolling.quantile(0.25)
-                features_df[f'{sensor_name}_q75_{window}'] = rolling.quantile(0.75)
-                features_df[f'{sensor_name}_iqr_{window}'] = (
-                    rolling.quantile(0.75) - rolling.quantile(0.25)
-                )
-                
-                # Trend features
-                features_df[f'{sensor_name}_trend_{window}'] = (
-                    sensor_pivot - rolling.mean()
-                )
-                
-                # Stability features
-                features_df[f'{sensor_name}_cv_{window}'] = (
-                    rolling.std() / rolling.mean()
-                )
+            # Statistical, percentile, trend and stability features for
+            # different time windows
+            for window_idx, window in enumerate(self.config.aggregation_windows):
+                for stat_idx, stat in enumerate(WINDOW_STATS):
+                    features[f'{sensor_name}_{stat}_{window}'] = (
+                        window_stats[sensor_idx, :, window_idx, stat_idx]
+                    )
             
             # Rate of change features
-            features_df[f'{sensor_name}_roc_1h'] = sensor_pivot.diff(periods=12)  # 5min intervals
-            features_df[f'{sensor_name}_roc_3h'] = sensor_pivot.diff(periods=36)
-            features_df[f'{sensor_name}_roc_6h'] = sensor_pivot.diff(periods=72)
+            roc_1h = sensor_values.diff(periods=12)  # 5min intervals
+            features[f'{sensor_name}_roc_1h'] = roc_1h.to_numpy()
+            features[f'{sensor_name}_roc_3h'] = sensor_values.diff(periods=36).to_numpy()
+            features[f'{sensor_name}_roc_6h'] = sensor_values.diff(periods=72).to_numpy()
             
             # Acceleration (second derivative)
-            features_df[f'{sensor_name}_acceleration'] = (
-                features_df[f'{sensor_name}_roc_1h'].diff()
-            )
+            features[f'{sensor_name}_acceleration'] = roc_1h.diff().to_numpy()
             
             # Lag features
             if self.config.include_lag_features:
                 for lag_hours in range(1, self.config.max_lag_hours + 1):
                     lag_periods = lag_hours * 12  # 5-minute intervals
-                    features_df[f'{sensor_name}_lag_{lag_hours}h'] = (
-                        sensor_pivot.shift(lag_periods)
+                    features[f'{sensor_name}_lag_{lag_hours}h'] = (
+                        sensor_values.shift(lag_periods).to_numpy()
                     )
             
             # Anomaly indicators (Z-score based)
-            rolling_24h = sensor_pivot.rolling('24H')
-            z_scores = (sensor_pivot - rolling_24h.mean()) / rolling_24h.std()
-            features_df[f'{sensor_name}_zscore'] = z_scores
-            features_df[f'{sensor_name}_is_anomaly'] = (np.abs(z_scores) > 3).astype(int)
+            # Flat windows have zero std; their z-score is left as NaN/inf
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z_scores = (
+                    (values - roll_mean(values, ZSCORE_PERIODS)) / roll_std(values, ZSCORE_PERIODS)
+                )
+            features[f'{sensor_name}_zscore'] = z_scores
+            features[f'{sensor_name}_is_anomaly'] = (np.abs(z_scores) > 3).view(np.uint8)
             
             # Sensor-specific features
             if sensor_type == 'Temperature':
                 # Temperature shock indicators
-                features_df['temp_shock_risk'] = (
-                    np.abs(features_df[f'{sensor_name}_roc_1h']) > 2.0
-                ).astype(int)
+                features['temp_shock_risk'] = (
+                    np.abs(features[f'{sensor_name}_roc_1h']) > 2.0
+                ).view(np.uint8)
                 
                 # Thermal stratification risk
-                features_df['thermal_stratification'] = (
-                    features_df[f'{sensor_name}_std_3H'] > 1.5
-                ).astype(int)
+                features['thermal_stratification'] = (
+                    features[f'{sensor_name}_std_3H'] > 1.5
+                ).view(np.uint8)
             
             elif sensor_type == 'pH':
                 # pH stability score
-                features_df['ph_stability'] = 1 / (1 + features_df[f'{sensor_name}_std_6H'])
+                features['ph_stability'] = 1 / (1 + features[f'{sensor_name}_std_6H'])
                 
                 # pH stress indicators
-                features_df['ph_stress_low'] = (sensor_pivot < 6.5).astype(int)
-                features_df['ph_stress_high'] = (sensor_pivot > 8.5).astype(int)
+                features['ph_stress_low'] = (values < 6.5).view(np.uint8)
+                features['ph_stress_high'] = (values > 8.5).view(np.uint8)
             
             elif sensor_type == 'DissolvedOxygen':
                 # Oxygen depletion risk
-                features_df['oxygen_depletion_risk'] = (sensor_pivot < 4.0).astype(int)
-                features_df['oxygen_critical'] = (sensor_pivot < 2.0).astype(int)
+                features['oxygen_depletion_risk'] = (values < 4.0).view(np.uint8)
+                features['oxygen_critical'] = (values < 2.0).view(np.uint8)
                 
                 # Oxygen trend (important for early warning)
-                features_df['oxygen_declining_trend'] = (
-                    features_df[f'{sensor_name}_trend_3H'] < -0.5
-                ).astype(int)
+                features['oxygen_declining_trend'] = (
+                    features[f'{sensor_name}_trend_3H'] < -0.5
+                ).view(np.uint8)
         
         # Cross-sensor interaction features
-        if 'temperature' in [s.lower() for s in self.config.sensor_types] and \
-           'dissolvedoxygen' in [s.lower() for s in self.config.sensor_types]:
-            
-            # Temperature-oxygen relationship (inverse correlation expected)
-            temp_cols = [c for c in features_df.columns if c.startswith('temperature_mean')]
-            oxygen_cols = [c for c in features_df.columns if c.startswith('dissolvedoxygen_mean')]
+        sensor_names = [s.lower() for s in self.config.sensor_types]
+        if 'temperature' in sensor_names and 'dissolvedoxygen' in sensor_names:
+            temp_idx = sensor_names.index('temperature')
+            oxygen_idx = sensor_names.index('dissolvedoxygen')
             
-            if temp_cols and oxygen_cols:
-                for temp_col, oxygen_col in zip(temp_cols, oxygen_cols):
-                    window = temp_col.split('_')[-1]
-                    features_df[f'temp_oxygen_ratio_{window}'] = (
-                        features_df[temp_col] / (features_df[oxygen_col] + 1e-6)
-                    )
-        
-        # Reset index to include time
-        features_df = features_df.reset_index()
+            if not (np.isnan(grid[temp_idx]).all() or np.isnan(grid[oxygen_idx]).all()):
+                # Temperature-oxygen relationship (inverse correlation expected),
+                # for all windows at once from the (n_samples, n_windows) means
+                mean_idx = WINDOW_STATS.index('mean')
+                temp_means = window_stats[temp_idx, :, :, mean_idx]
+                oxygen_means = window_stats[oxygen_idx, :, :, mean_idx]
+                ratios = temp_means / (oxygen_means + FEATURE_DTYPE(1e-6))
+                features.update(zip(
+                    (f'temp_oxygen_ratio_{window}' for window in self.config.aggregation_windows), 
+                    ratios.T
+                ))
+        
+        # Build the frame once, with time as a column
+        features_df = pd.DataFrame(features, index=time_index).reset_index()
         
         return features_df
     
-    def create_tank_context_features(self, tank_id: str, df: pd.DataFrame) -> pd.DataFrame:
-        """Create tank-specific context features"""
-        # Get tank metadata
-        tank_query = """
-        SELECT 
-            capacity_value,
-            capacity_unit,
-            tank_type,
-            location,
-            optimal_parameters
-        FROM sensor_data.tanks
-        WHERE id = %s
-        """
+    def _get_tank_metadata(self, tank_id: str) -> Optional[Dict]:
+        """Get tank metadata, cached in Redis since it rarely changes"""
+        cache_key = f"tank_meta:{tank_id}"
+        cached_metadata = self.redis_client.get(cache_key)
+        
+        if cached_metadata:
+            return msgpack.unpackb(cached_metadata, raw=False)
         
-        tank_info = pd.read_sql_query(tank_query, self.engine, params=[tank_id])
+        tank_info = pd.read_sql_query("EXECUTE tank_metadata(%s)", self.engine, params=(tank_id,))
         
         if tank_info.empty:
-            return df
+            return None
         
         tank_data = tank_info.iloc[0]
+        metadata = {
+            'capacity_value': float(tank_data['capacity_value']),
+            'capacity_unit': tank_data['capacity_unit'],
+            'tank_type': tank_data['tank_type'],
+            'location': _jsonb_dict(tank_data['location']),
+            'optimal_parameters': _jsonb_dict(tank_data['optimal_parameters'])
+        }
         
-        # Add tank metadata as features
-        df['tank_capacity'] = tank_data['capacity_value']
-        df['tank_type_encoded'] = hash(tank_data['tank_type']) % 1000  # Simple encoding
+        # Cache tank metadata for 24 hours
+        self.redis_client.setex(cache_key, 86400, msgpack.packb(metadata, use_bin_type=True))
         
-        # Location-based features
-        location = json.loads(tank_data['location']) if tank_data['location'] else {}
-        df['building_encoded'] = hash(location.get('building', '')) % 100
-        df['room_encoded'] = hash(location.get('room', '')) % 100
+        return metadata
+    
+    def create_tank_context_features(self, tank_id: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Create tank-specific context features"""
+        tank_data = self._get_tank_metadata(tank_id)
         
-        # Optimal parameters deviation
-        if tank_data['optimal_parameters']:
-            optimal = json.loads(tank_data['optimal_parameters'])
-            
-            for param, optimal_value in optimal.items():
-                if param in df.columns:
-                    df[f'{param}_deviation'] = np.abs(df[param] - optimal_value)
-                    df[f'{param}_within_optimal'] = (
-                        np.abs(df[param] - optimal_value) < optimal_value * 0.1
-                    ).astype(int)
+        if tank_data is None:
+            return df
         
-        return df
-    
-    def engineer_features(self, tank_id: str, target_time: datetime) -> pd.DataFrame:
-        """Main feature engineering pipeline"""
-        logger.info(f"Engineering features for tank {tank_id} at {target_time}")
+        # Stable encodings, computed once and broadcast as scalars
+        tank_type_encoded = _stable_hash(tank_data['tank_type']) % 1000
+        location = tank_data['location']
+        building_encoded = _stable_hash(location.get('building', '')) % 100
+        room_encoded = _stable_hash(location.get('room', '')) % 100
         
-        # Check cache first
-        cache_key = f"features:{tank_id}:{target_time.isoformat()}"
-        cached_features = self.redis_client.get(cache_key)
+        # Add tank metadata as features
+        df['tank_capacity'] = FEATURE_DTYPE(tank_data['capacity_value'])
+        df['tank_type_encoded'] = np.int32(tank_type_encoded)
         
-        if cached_features:
-            logger.info("Using cached features")
-            return pd.read_json(cached_features)
+        # Location-based features
+        df['building_encoded'] = np.int32(building_encoded)
+        df['room_encoded'] = np.int32(room_encoded)
         
-        # Define time window
-        start_time = target_time - timedelta(hours=self.config.lookback_hours)
-        end_time = target_time
+        # Optimal parameters deviation, computed for all parameters at once
+        params = [param for param in tank_data['optimal_parameters'] if param in df.columns]
         
-        # Extract raw sensor data
-        raw_data = self.extract_sensor_data(tank_id, start_time, end_time)
+        if params:
+            optimal = np.array(
+                [tank_data['optimal_parameters'][param] for param in params], 
+                dtype=FEATURE_DTYPE
+            )
+            deviation = np.abs(df[params].to_numpy(dtype=FEATURE_DTYPE) - optimal)
+            within_optimal = (deviation < optimal * 0.1).view(np.uint8)
+            
+            optimal_features = {}
+            for i, param in enumerate(params):
+                optimal_features[f'{param}_deviation'] = deviation[:, i]
+                optimal_features[f'{param}_within_optimal'] = within_optimal[:, i]
+            
+            df = pd.concat([df, pd.DataFrame(optimal_features, index=df.index)], axis=1)
         
+        return df
+    
+    def _feature_cache_key(self, tank_id: str, iso_time: str) -> str:
+        """Redis key of the cached feature frame for a tank at an ISO-formatted time"""
+        # v2: Feather payloads; keeps old to_json() entries from being decoded
+        return f"features:v2:{tank_id}:{iso_time}"
+    
+    def _build_features(self, tank_id: str, target_time: datetime, raw_data: pd.DataFrame) -> pd.DataFrame:
+        """Build the feature frame for a tank at target_time from its raw readings"""
         if raw_data.empty:
             logger.warning(f"No sensor data found for tank {tank_id}")
             return pd.DataFrame()
@@ -336,43 +517,149 @@ class AquacultureFeatureEngineer:
         # Add tank context features
         final_features = self.create_tank_context_features(tank_id, sensor_features)
         
-        # Handle missing values
-        imputer = SimpleImputer(strategy='median')
-        numeric_columns = final_features.select_dtypes(include=[np.number]).columns
-        final_features[numeric_columns] = imputer.fit_transform(final_features[numeric_columns])
+        # Handle missing values with column medians (integer columns cannot hold NaN)
+        numeric_columns = final_features.select_dtypes(include=[np.floating]).columns
+        values = final_features[numeric_columns].to_numpy(copy=True)
+        missing = np.isnan(values)
+        if missing.any():
+            with warnings.catch_warnings():
+                # All-NaN columns have no median and are left as NaN
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                medians = np.nanmedian(values, axis=0)
+            rows, cols = np.nonzero(missing)
+            values[rows, cols] = np.take(medians, cols)
+            final_features.loc[:, numeric_columns] = values
         
         # Add metadata
         final_features['tank_id'] = tank_id
         final_features['feature_timestamp'] = target_time
         final_features['feature_version'] = 'v1.0'
         
+        logger.info(f"Generated {len(final_features.columns)} features for tank {tank_id}")
+        
+        return final_features
+    
+    def _build_window_features(self, tank_id: str, target_time: datetime, 
+                               tank_readings: pd.DataFrame) -> pd.DataFrame:
+        """Build features for target_time from a tank's time-sorted readings"""
+        lookback = timedelta(hours=self.config.lookback_hours)
+        
+        # readings.time is TIMESTAMPTZ; compare naive target times in the readings' zone
+        window_end = pd.Timestamp(target_time)
+        readings_tz = getattr(tank_readings['time'].dtype, 'tz', None)
+        if readings_tz is not None and window_end.tz is None:
+            window_end = window_end.tz_localize(readings_tz)
+        elif readings_tz is None and window_end.tz is not None:
+            window_end = window_end.tz_localize(None)
+        
+        lo = tank_readings['time'].searchsorted(window_end - lookback, side='left')
+        hi = tank_readings['time'].searchsorted(window_end, side='right')
+        raw_data = tank_readings.iloc[lo:hi].reset_index(drop=True)
+        
+        return self._build_features(tank_id, target_time, raw_data)
+    
+    def engineer_features(self, tank_id: str, target_time: datetime) -> pd.DataFrame:
+        """Main feature engineering pipeline"""
+        logger.info(f"Engineering features for tank {tank_id} at {target_time}")
+        
+        # Check cache first
+        cache_key = self._feature_cache_key(tank_id, target_time.isoformat())
+        cached_features = self.redis_client.get(cache_key)
+        
+        if cached_features:
+            logger.info("Using cached features")
+            return _deserialize_features(cached_features)
+        
+        # Define time window
+        start_time = target_time - timedelta(hours=self.config.lookback_hours)
+        end_time = target_time
+        
+        # Extract raw sensor data
+        raw_data = self.extract_sensor_data(tank_id, start_time, end_time)
+        
+        final_features = self._build_features(tank_id, target_time, raw_data)
+        
+        if final_features.empty:
+            return final_features
+        
         # Cache features for 1 hour
         self.redis_client.setex(
             cache_key, 
             3600, 
-            final_features.to_json()
+            _serialize_features(final_features)
         )
         
-        logger.info(f"Generated {len(final_features.columns)} features for tank {tank_id}")
-        
         return final_features
     
     def batch_engineer_features(self, tank_ids: List[str], start_time: datetime, 
                               end_time: datetime, interval_hours: int = 1) -> pd.DataFrame:
         """Batch feature engineering for multiple tanks and time periods"""
-        all_features = []
-        
-        current_time = start_time
-        while current_time <= end_time:
-            for tank_id in tank_ids:
-                try:
-                    features = self.engineer_features(tank_id, current_time)
-                    if not features.empty:
-                        all_features.append(features)
-                except Exception as e:
-                    logger.error(f"Error engineering features for tank {tank_id} at {current_time}: {e}")
+        timestamps = pd.date_range(
+            start_time, end_time, freq=pd.Timedelta(hours=interval_hours)
+        ).to_pydatetime()
+        iso_times = [ts.isoformat() for ts in timestamps]
+        
+        pairs = [(tank_id, ts) for ts in timestamps for tank_id in tank_ids]
+        if not pairs:
+            return pd.DataFrame()
+        
+        # Look up every (tank, time) pair in the cache with a single MGET
+        keys = [
+            self._feature_cache_key(tank_id, iso_time) 
+            for iso_time in iso_times for tank_id in tank_ids
+        ]
+        cached = self.redis_client.mget(keys)
+        
+        results = [None] * len(pairs)
+        misses = []
+        for i, payload in enumerate(cached):
+            if payload is None:
+                misses.append(i)
+            else:
+                results[i] = _deserialize_features(payload)
+        
+        logger.info(f"Feature cache hits: {len(pairs) - len(misses)}/{len(pairs)}")
+        
+        if misses:
+            # Fetch readings for all cache misses with a single query
+            lookback = timedelta(hours=self.config.lookback_hours)
+            miss_tanks = sorted({pairs[i][0] for i in misses})
+            readings = self.extract_sensor_data_batch(miss_tanks, start_time - lookback, end_time)
+            readings_by_tank = {
+                tank_id: tank_readings.reset_index(drop=True)
+                for tank_id, tank_readings in readings.groupby('tank_id', sort=False)
+            }
             
-            current_time += timedelta(hours=interval_hours)
+            # Build the missing features concurrently; the work is dominated by
+            # Redis/Postgres round-trips and numpy/numba code that releases the GIL
+            new_items = []
+            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+                futures = {}
+                for i in misses:
+                    tank_id, ts = pairs[i]
+                    tank_readings = readings_by_tank.get(tank_id, readings.iloc[:0])
+                    future = executor.submit(self._build_window_features, tank_id, ts, tank_readings)
+                    futures[future] = i
+                
+                for future in as_completed(futures):
+                    i = futures[future]
+                    tank_id, ts = pairs[i]
+                    try:
+                        features = future.result()
+                        if not features.empty:
+                            results[i] = features
+                            new_items.append((keys[i], _serialize_features(features)))
+                    except Exception as e:
+                        logger.error(f"Error engineering features for tank {tank_id} at {ts}: {e}")
+            
+            # Cache new features for 1 hour in a single round-trip
+            if new_items:
+                pipe = self.redis_client.pipeline()
+                for key, payload in new_items:
+                    pipe.setex(key, 3600, payload)
+                pipe.execute()
+        
+        all_features = [features for features in results if features is not None]
         
         if all_features:
             return pd.concat(all_features, ignore_index=True)
@@ -384,35 +671,66 @@ class AquacultureFeatureEngineer:
         if features_df.empty:
             return
         
+        # One feature row per (feature_timestamp, tank_id); a single INSERT batch
+        # cannot touch the same conflict key twice, and the last row wins anyway
+        features_df = features_df.drop_duplicates(
+            subset=['feature_timestamp', 'tank_id'], keep='last'
+        )
+        
         # Prepare features JSON
-        feature_columns = [col for col in features_df.columns 
-                          if col not in ['tank_id', 'feature_timestamp', 'feature_version']]
+        meta_columns = ['tank_id', 'feature_timestamp', 'feature_version']
+        feature_columns = [col for col in features_df.columns if col not in meta_columns]
+        
+        # Encode every row in one call to pandas' C JSON writer; missing values
+        # are written as nulls and stripped by Postgres when building the JSONB
+        features_json = features_df[feature_columns].to_json(
+            orient='records', 
+            lines=True, 
+            date_format='iso'
+        ).splitlines()
+        
+        records = [
+            {
+                'feature_timestamp': ts,
+                'tank_id': tid,
+                'features': features,
+                'feature_version': fv
+            }
+            for ts, tid, fv, features in zip(
+                features_df['feature_timestamp'],
+                features_df['tank_id'],
+                features_df['feature_version'],
+                features_json
+            )
+        ]
         
-        records = []
-        for _, row in features_df.iterrows():
-            features_json = {col: row[col] for col in feature_columns if pd.notna(row[col])}
-            
-            records.append({
-                'feature_timestamp': row['feature_timestamp'],
-                'tank_id': row['tank_id'],
-                'features': json.dumps(features_json),
-                'feature_version': row['feature_version']
-            })
-        
-        # Insert into database
+        # Insert into database in a single round-trip
         insert_query = """
         INSERT INTO ml_features.tank_features 
         (feature_timestamp, tank_id, features, feature_version)
-        VALUES (%(feature_timestamp)s, %(tank_id)s, %(features)s, %(feature_version)s)
+        VALUES %s
         ON CONFLICT (feature_timestamp, tank_id) 
         DO UPDATE SET 
             features = EXCLUDED.features,
             feature_version = EXCLUDED.feature_version
         """
         
-        with self.engine.connect() as conn:
-            conn.execute(insert_query, records)
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    insert_query,
+                    records,
+                    template=(
+                        "(%(feature_timestamp)s, %(tank_id)s, "
+                        "jsonb_strip_nulls(%(features)s::jsonb), %(feature_version)s)"
+                    ),
+                    page_size=len(records)
+                )
             conn.commit()
+        finally:
+            conn.close()
         
         logger.info(f"Saved {len(records)} feature records to database")
 
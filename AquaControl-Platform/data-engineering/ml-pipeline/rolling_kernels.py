@@ -0,0 +1,243 @@
+import numpy as np
+from numba import njit
+
+# Rolling-window kernels for sensor feature engineering.
+#
+# Windows are expressed as a number of samples. Like pandas time-based
+# rolling, a value is emitted as soon as the window holds one observation,
+# and NaN observations are skipped. Outputs keep the input dtype (float32
+# for the sensor grid); running sums are accumulated in float64.
+#
+# The public kernels are compiled eagerly for float32 and float64 inputs and
+# cached on disk (cache=True), so importing this module loads ready machine
+# code instead of JIT-compiling on the first engineer_features call in each
+# worker process.
+
+# Stat axis of the compute_all_stats output
+WINDOW_STATS = ('mean', 'std', 'min', 'max', 'range', 'q25', 'q75', 'iqr', 'trend', 'cv')
+N_STATS = len(WINDOW_STATS)
+
+
+@njit(['f4[::1](f4[::1], i8)', 'f8[::1](f8[::1], i8)'], cache=True, nogil=True)
+def roll_mean(x, w):
+    """Rolling mean using a running sum"""
+    n = x.shape[0]
+    out = np.empty(n, dtype=x.dtype)
+    total = 0.0
+    count = 0
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            total += v
+            count += 1
+        if i >= w:
+            old = x[i - w]
+            if not np.isnan(old):
+                total -= old
+                count -= 1
+        out[i] = total / count if count > 0 else np.nan
+    return out
+
+
+@njit(['f4[::1](f4[::1], i8)', 'f8[::1](f8[::1], i8)'], cache=True, nogil=True)
+def roll_std(x, w):
+    """Rolling sample standard deviation (ddof=1) using Welford add/remove"""
+    n = x.shape[0]
+    out = np.empty(n, dtype=x.dtype)
+    mean = 0.0
+    m2 = 0.0
+    count = 0
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            count += 1
+            delta = v - mean
+            mean += delta / count
+            m2 += delta * (v - mean)
+        if i >= w:
+            old = x[i - w]
+            if not np.isnan(old):
+                count -= 1
+                if count == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    delta = old - mean
+                    mean -= delta / count
+                    m2 -= delta * (old - mean)
+        if count > 1:
+            out[i] = np.sqrt(max(m2, 0.0) / (count - 1))
+        else:
+            out[i] = np.nan
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _deque_push(deque, head, size, x, i, is_max):
+    """Push sample i onto a monotonic ring deque of indices; returns the new size"""
+    cap = deque.shape[0]
+    v = x[i]
+    while size > 0:
+        last = x[deque[(head + size - 1) % cap]]
+        if (last <= v) if is_max else (last >= v):
+            size -= 1
+        else:
+            break
+    deque[(head + size) % cap] = i
+    return size + 1
+
+
+@njit(cache=True, nogil=True)
+def _sorted_insert(buf, count, v):
+    """Insert v into the sorted buf[:count]"""
+    pos = np.searchsorted(buf[:count], v)
+    for k in range(count, pos, -1):
+        buf[k] = buf[k - 1]
+    buf[pos] = v
+
+
+@njit(cache=True, nogil=True)
+def _sorted_remove(buf, count, v):
+    """Remove one occurrence of v from the sorted buf[:count]"""
+    pos = np.searchsorted(buf[:count], v)
+    for k in range(pos, count - 1):
+        buf[k] = buf[k + 1]
+
+
+@njit(cache=True, nogil=True)
+def _interp_quantile(buf, count, q):
+    """Quantile q (linear interpolation) of the sorted buf[:count]"""
+    idx = q * (count - 1)
+    lo = int(np.floor(idx))
+    hi = min(lo + 1, count - 1)
+    return buf[lo] + (buf[hi] - buf[lo]) * (idx - lo)
+
+
+@njit(['void(f4[:])', 'void(f8[:])'], cache=True, nogil=True)
+def ffill_1d(x):
+    """Forward-fill NaNs in place"""
+    for i in range(1, x.shape[0]):
+        if np.isnan(x[i]):
+            x[i] = x[i - 1]
+
+
+@njit(['void(f4[:, ::1])', 'void(f8[:, ::1])'], cache=True, nogil=True)
+def fill_gaps(arr):
+    """Forward- then back-fill NaNs in place along each row of a 2D array"""
+    n = arr.shape[1]
+    for s in range(arr.shape[0]):
+        x = arr[s]
+        ffill_1d(x)
+        # Leading NaNs take the first observed value
+        first = 0
+        while first < n and np.isnan(x[first]):
+            first += 1
+        if 0 < first < n:
+            x[:first] = x[first]
+
+
+# Not parallel=True: callers already run these kernels from worker threads
+# (nogil lets them overlap), and numba's parallel launch is not safe to
+# re-enter from several threads with every threading layer.
+# error_model='numpy' so a zero window mean gives inf/NaN cv, like pandas
+@njit(
+    ['f4[:, :, :, ::1](f4[:, ::1], i8[::1])', 'f8[:, :, :, ::1](f8[:, ::1], i8[::1])'], 
+    cache=True, nogil=True, error_model='numpy'
+)
+def compute_all_stats(arr, window_sizes):
+    """Rolling WINDOW_STATS for every series and window size in one sweep
+    
+    Each sample is read once and pushed into the running state of every
+    window: running sums (mean), Welford sums (std), monotonic deques
+    (min/max) and sorted buffers (quartiles). Returns an array of shape
+    (n_series, n_samples, len(window_sizes), len(WINDOW_STATS)).
+    """
+    n_series, n = arr.shape
+    n_windows = window_sizes.shape[0]
+    max_w = window_sizes.max()
+    out = np.empty((n_series, n, n_windows, N_STATS), dtype=arr.dtype)
+    
+    totals = np.empty(n_windows, dtype=np.float64)
+    means = np.empty(n_windows, dtype=np.float64)
+    m2s = np.empty(n_windows, dtype=np.float64)
+    counts = np.empty(n_windows, dtype=np.int64)
+    min_deques = np.empty((n_windows, max_w), dtype=np.int64)
+    max_deques = np.empty((n_windows, max_w), dtype=np.int64)
+    min_heads = np.empty(n_windows, dtype=np.int64)
+    max_heads = np.empty(n_windows, dtype=np.int64)
+    min_sizes = np.empty(n_windows, dtype=np.int64)
+    max_sizes = np.empty(n_windows, dtype=np.int64)
+    sorted_bufs = np.empty((n_windows, max_w), dtype=arr.dtype)
+    
+    for s in range(n_series):
+        x = arr[s]
+        totals[:] = 0.0
+        means[:] = 0.0
+        m2s[:] = 0.0
+        counts[:] = 0
+        min_heads[:] = 0
+        max_heads[:] = 0
+        min_sizes[:] = 0
+        max_sizes[:] = 0
+        
+        for i in range(n):
+            v = x[i]
+            for j in range(n_windows):
+                w = window_sizes[j]
+                
+                # Evict the sample that left this window
+                if i >= w:
+                    old = x[i - w]
+                    if not np.isnan(old):
+                        _sorted_remove(sorted_bufs[j], counts[j], old)
+                        totals[j] -= old
+                        counts[j] -= 1
+                        if counts[j] == 0:
+                            means[j] = 0.0
+                            m2s[j] = 0.0
+                        else:
+                            delta = old - means[j]
+                            means[j] -= delta / counts[j]
+                            m2s[j] -= delta * (old - means[j])
+                    if min_sizes[j] > 0 and min_deques[j, min_heads[j]] <= i - w:
+                        min_heads[j] = (min_heads[j] + 1) % max_w
+                        min_sizes[j] -= 1
+                    if max_sizes[j] > 0 and max_deques[j, max_heads[j]] <= i - w:
+                        max_heads[j] = (max_heads[j] + 1) % max_w
+                        max_sizes[j] -= 1
+                
+                # Add the new sample
+                if not np.isnan(v):
+                    _sorted_insert(sorted_bufs[j], counts[j], v)
+                    totals[j] += v
+                    counts[j] += 1
+                    delta = v - means[j]
+                    means[j] += delta / counts[j]
+                    m2s[j] += delta * (v - means[j])
+                    min_sizes[j] = _deque_push(min_deques[j], min_heads[j], min_sizes[j], x, i, False)
+                    max_sizes[j] = _deque_push(max_deques[j], max_heads[j], max_sizes[j], x, i, True)
+                
+                count = counts[j]
+                o = out[s, i, j]
+                if count == 0:
+                    o[:] = np.nan
+                    continue
+                
+                mean = totals[j] / count
+                std = np.sqrt(max(m2s[j], 0.0) / (count - 1)) if count > 1 else np.nan
+                lo = x[min_deques[j, min_heads[j]]]
+                hi = x[max_deques[j, max_heads[j]]]
+                q25 = _interp_quantile(sorted_bufs[j], count, 0.25)
+                q75 = _interp_quantile(sorted_bufs[j], count, 0.75)
+                # Written in WINDOW_STATS order; keep the two in sync
+                o[0] = mean
+                o[1] = std
+                o[2] = lo
+                o[3] = hi
+                o[4] = hi - lo
+                o[5] = q25
+                o[6] = q75
+                o[7] = q75 - q25
+                o[8] = v - mean
+                o[9] = std / mean
+    return out
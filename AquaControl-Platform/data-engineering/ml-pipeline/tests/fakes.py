@@ -0,0 +1,75 @@
+from feature_engineering import AquacultureFeatureEngineer, FeatureConfig
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.Redis calls the pipeline makes"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+
+    def execute(self):
+        for command in self.commands:
+            self.client.setex(*command)
+
+
+class FakeRawConnection:
+    """DB-API connection stand-in for engine.raw_connection()"""
+
+    def __init__(self):
+        self.committed = False
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeEngine:
+    def __init__(self):
+        self.connection = FakeRawConnection()
+
+    def raw_connection(self):
+        return self.connection
+
+
+def make_engineer(**config) -> AquacultureFeatureEngineer:
+    """Engineer wired to a FakeRedis; there is no database or Redis server in tests"""
+    engineer = AquacultureFeatureEngineer.__new__(AquacultureFeatureEngineer)
+    engineer.config = FeatureConfig(max_workers=2, **config)
+    engineer.engine = None
+    engineer.redis_client = FakeRedis()
+    return engineer
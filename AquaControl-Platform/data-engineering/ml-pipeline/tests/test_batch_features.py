@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fakes import make_engineer
+from feature_engineering import AquacultureFeatureEngineer
+
+TANK_IDS = ['tank-1', 'tank-2']
+BASELINES = {'Temperature': 20.0, 'pH': 7.5, 'DissolvedOxygen': 6.0, 'Salinity': 30.0}
+METADATA = {
+    'capacity_value': 100.0,
+    'capacity_unit': 'm3',
+    'tank_type': 'RAS',
+    'location': {'building': 'B1', 'room': 'R2'},
+    'optimal_parameters': {'temperature_mean_1H': 20.0}
+}
+
+
+def _readings(tz=None) -> pd.DataFrame:
+    """Time-sorted 5-minute readings for every tank and sensor type"""
+    rng = np.random.default_rng(0)
+    times = pd.date_range('2024-03-01', periods=600, freq='5min', tz=tz)
+    frames = [
+        pd.DataFrame({
+            'time': times,
+            'tank_id': tank_id,
+            'sensor_type': sensor_type,
+            'value': (baseline + rng.normal(0, 1, len(times))).astype(np.float32),
+            'quality_score': np.float32(0.9)
+        })
+        for tank_id in TANK_IDS
+        for sensor_type, baseline in BASELINES.items()
+    ]
+    readings = pd.concat(frames, ignore_index=True)
+    return readings.sort_values(['tank_id', 'time', 'sensor_type'], kind='stable', ignore_index=True)
+
+
+def _engineer(readings: pd.DataFrame, monkeypatch) -> AquacultureFeatureEngineer:
+    engineer = make_engineer()
+    monkeypatch.setattr(engineer, 'extract_sensor_data_batch', lambda tank_ids, start, end: readings)
+    monkeypatch.setattr(engineer, '_get_tank_metadata', lambda tank_id: METADATA)
+    return engineer
+
+
+@pytest.mark.parametrize('tz', [None, 'UTC'])
+def test_batch_with_naive_times_slices_readings(tz, monkeypatch):
+    engineer = _engineer(_readings(tz), monkeypatch)
+
+    features = engineer.batch_engineer_features(
+        TANK_IDS, datetime(2024, 3, 2, 0), datetime(2024, 3, 2, 12), interval_hours=6
+    )
+
+    assert len(features) > 0
+    assert set(features['tank_id']) == set(TANK_IDS)
+    assert features['feature_timestamp'].nunique() == 3
+
+
+def test_batch_tz_aware_readings_match_naive(monkeypatch):
+    start, end = datetime(2024, 3, 2, 0), datetime(2024, 3, 2, 12)
+    naive = _engineer(_readings(), monkeypatch).batch_engineer_features(TANK_IDS, start, end, 6)
+    aware = _engineer(_readings('UTC'), monkeypatch).batch_engineer_features(TANK_IDS, start, end, 6)
+
+    feature_columns = [c for c in naive.columns if c != 'time']
+    pd.testing.assert_frame_equal(aware[feature_columns], naive[feature_columns])
+
+
+def test_batch_ignores_pre_feather_cache_entries(monkeypatch):
+    start, end = datetime(2024, 3, 2, 0), datetime(2024, 3, 2, 12)
+    engineer = _engineer(_readings(), monkeypatch)
+    # Entries written by the to_json() cache format, still live after a deploy
+    for tank_id in TANK_IDS:
+        for ts in pd.date_range(start, end, freq='6h'):
+            engineer.redis_client.store[f"features:{tank_id}:{ts.isoformat()}"] = b'{"time":{}}'
+
+    features = engineer.batch_engineer_features(TANK_IDS, start, end, 6)
+
+    assert len(features) > 0
+    assert features['feature_timestamp'].nunique() == 3
+    # A second run is served entirely from the new cache entries
+    pd.testing.assert_frame_equal(engineer.batch_engineer_features(TANK_IDS, start, end, 6), features)
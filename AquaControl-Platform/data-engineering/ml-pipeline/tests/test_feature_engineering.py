@@ -0,0 +1,202 @@
+import json
+import warnings
+
+import msgpack
+import numpy as np
+import pandas as pd
+import pytest
+
+import feature_engineering
+from fakes import FakeEngine, make_engineer
+
+LOCATION = {'building': 'B1', 'room': 'R2'}
+OPTIMAL_PARAMETERS = {'temperature_mean_1H': 20.0, 'ph_mean_1H': 7.5}
+
+
+def _tank_row(location, optimal_parameters) -> pd.DataFrame:
+    return pd.DataFrame({
+        'capacity_value': [100.0],
+        'capacity_unit': ['m3'],
+        'tank_type': ['RAS'],
+        'location': [location],
+        'optimal_parameters': [optimal_parameters]
+    })
+
+
+@pytest.mark.parametrize('location, optimal_parameters', [
+    # psycopg2 decodes JSONB columns into dicts
+    (LOCATION, OPTIMAL_PARAMETERS),
+    # JSON text, as read through drivers that do not decode JSONB
+    (json.dumps(LOCATION), json.dumps(OPTIMAL_PARAMETERS)),
+])
+def test_get_tank_metadata_caches_query_result(location, optimal_parameters, monkeypatch):
+    engineer = make_engineer()
+    queries = []
+
+    def read_sql_query(query, con, params=None, **kwargs):
+        queries.append((query, params))
+        return _tank_row(location, optimal_parameters)
+
+    monkeypatch.setattr(feature_engineering.pd, 'read_sql_query', read_sql_query)
+
+    metadata = engineer._get_tank_metadata('tank-1')
+
+    assert metadata == {
+        'capacity_value': 100.0,
+        'capacity_unit': 'm3',
+        'tank_type': 'RAS',
+        'location': LOCATION,
+        'optimal_parameters': OPTIMAL_PARAMETERS
+    }
+    assert queries == [("EXECUTE tank_metadata(%s)", ('tank-1',))]
+
+    cached = engineer.redis_client.store['tank_meta:tank-1']
+    assert msgpack.unpackb(cached, raw=False) == metadata
+
+    # Served from the cache on the next call
+    assert engineer._get_tank_metadata('tank-1') == metadata
+    assert len(queries) == 1
+
+
+def test_get_tank_metadata_null_jsonb_and_unknown_tank(monkeypatch):
+    engineer = make_engineer()
+    monkeypatch.setattr(
+        feature_engineering.pd, 'read_sql_query', lambda *args, **kwargs: _tank_row(None, None)
+    )
+    metadata = engineer._get_tank_metadata('tank-1')
+
+    assert metadata['location'] == {}
+    assert metadata['optimal_parameters'] == {}
+
+    monkeypatch.setattr(
+        feature_engineering.pd, 'read_sql_query', lambda *args, **kwargs: _tank_row(None, None).iloc[:0]
+    )
+    assert engineer._get_tank_metadata('tank-2') is None
+
+
+def _sensor_readings(values_by_type, times) -> pd.DataFrame:
+    frames = [
+        pd.DataFrame({'time': times, 'sensor_type': sensor_type, 'value': values})
+        for sensor_type, values in values_by_type.items()
+    ]
+    return pd.concat(frames, ignore_index=True).sort_values(['time', 'sensor_type'], kind='stable')
+
+
+def test_flat_sensor_zscore_is_silent():
+    engineer = make_engineer(sensor_types=['Temperature', 'pH'])
+    times = pd.date_range('2024-03-01', periods=300, freq='5min')
+    readings = _sensor_readings({'Temperature': np.full(300, 20.0), 'pH': np.linspace(7, 8, 300)}, times)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        features = engineer.create_sensor_features(readings)
+
+    assert features['temperature_zscore'].isna().all()
+    assert not features['temperature_is_anomaly'].any()
+    assert features['ph_zscore'].iloc[1:].notna().all()
+
+
+@pytest.mark.parametrize('tz', [None, 'UTC', 'Europe/Oslo'])
+def test_create_sensor_grid_bins_and_fills_gaps(tz):
+    engineer = make_engineer(sensor_types=['Temperature', 'pH', 'Salinity'])
+    start = pd.Timestamp('2024-03-01 00:00', tz=tz)
+    readings = pd.DataFrame({
+        'time': start + pd.to_timedelta([0, 5, 7, 20, 10, 20], unit='min'),
+        'sensor_type': ['Temperature', 'Temperature', 'Temperature', 'Temperature', 'pH', 'pH'],
+        # Two Temperature readings fall in the 00:05 bin; no reading at 00:10 or 00:15
+        'value': [10.0, 11.0, 13.0, 20.0, 7.0, 7.5],
+    })
+
+    time_index, grid = engineer.create_sensor_grid(readings)
+
+    expected_index = pd.date_range(start, periods=5, freq='5min', name='time')
+    pd.testing.assert_index_equal(time_index, expected_index)
+    assert grid.dtype == np.float32
+    # Bin means, forward-filled across the missing-reading gap
+    np.testing.assert_array_equal(grid[0], [10.0, 12.0, 12.0, 12.0, 20.0])
+    # Leading bins before the first pH reading are back-filled
+    np.testing.assert_array_equal(grid[1], [7.0, 7.0, 7.0, 7.0, 7.5])
+    # Salinity has no readings at all
+    assert np.isnan(grid[2]).all()
+
+
+def test_sensor_without_readings_is_skipped():
+    engineer = make_engineer(sensor_types=['Temperature', 'pH', 'Salinity'])
+    times = pd.date_range('2024-03-01', periods=50, freq='5min', tz='UTC')
+    readings = _sensor_readings({'Temperature': np.linspace(18, 22, 50), 'pH': np.full(50, 7.2)}, times)
+
+    features = engineer.create_sensor_features(readings)
+
+    assert len(features) == 50
+    assert features['time'].dt.tz is not None
+    assert any(c.startswith('temperature_') for c in features.columns)
+    assert not any(c.startswith('salinity_') for c in features.columns)
+
+
+@pytest.mark.parametrize('tz', [None, 'America/New_York'])
+def test_time_features_match_dt_accessors(tz):
+    engineer = make_engineer()
+    times = pd.DatetimeIndex([
+        '2024-01-15 03:00', '2024-03-02 08:30', '2024-03-02 08:30',
+        '2024-06-21 12:00', '2024-10-31 23:55', '2024-12-01 18:00',
+    ]).tz_localize(tz)
+    readings = pd.DataFrame({'time': times, 'sensor_type': 'Temperature', 'value': 20.0})
+
+    features = engineer.create_time_features(readings)
+
+    # Local wall-clock time for tz-aware readings
+    expected_seasons = ['winter', 'spring', 'spring', 'summer', 'autumn', 'winter']
+    assert [feature_engineering.SEASONS[code] for code in features['season']] == expected_seasons
+    np.testing.assert_array_equal(features['hour'], times.hour)
+    np.testing.assert_array_equal(features['day_of_week'], times.dayofweek)
+    np.testing.assert_array_equal(features['month'], times.month)
+    np.testing.assert_array_equal(features['quarter'], times.quarter)
+    np.testing.assert_array_equal(features['is_weekend'], times.dayofweek >= 5)
+    np.testing.assert_array_equal(features['is_feeding_time'], np.isin(times.hour, [8, 12, 18]))
+    assert features['season'].dtype == np.int8
+    pd.testing.assert_frame_equal(features[readings.columns], readings)
+
+
+def _reject_constant(token):
+    raise ValueError(f'non-standard JSON constant {token}')
+
+
+def test_save_features_to_db_encodes_rows(monkeypatch):
+    engineer = make_engineer()
+    engineer.engine = FakeEngine()
+    calls = []
+    monkeypatch.setattr(
+        feature_engineering, 'execute_values',
+        lambda cur, sql, argslist, template=None, page_size=100: calls.append((sql, argslist, template))
+    )
+    times = pd.date_range('2024-03-01 00:00', periods=3, freq='5min', tz='UTC')
+    features_df = pd.DataFrame({
+        'time': times,
+        'temperature_mean_1H': np.array([20.5, np.nan, 21.0], dtype=np.float32),
+        'temp_oxygen_ratio_1H': np.array([np.inf, -np.inf, 3.5], dtype=np.float32),
+        'ph_stress_low': np.array([0, 1, 0], dtype=np.uint8),
+        'is_weekend': [True, False, True],
+        'tank_id': ['tank-1', 'tank-1', 'tank-1'],
+        # Rows 0 and 2 share a conflict key; the last one is kept
+        'feature_timestamp': [times[0], times[1], times[0]],
+        'feature_version': 'v1.0',
+    })
+
+    engineer.save_features_to_db(features_df)
+
+    [(sql, records, template)] = calls
+    assert 'ON CONFLICT (feature_timestamp, tank_id)' in sql
+    assert 'jsonb_strip_nulls(%(features)s::jsonb)' in template
+    assert [(r['feature_timestamp'], r['tank_id']) for r in records] == [(times[1], 'tank-1'), (times[0], 'tank-1')]
+    assert engineer.engine.connection.committed and engineer.engine.connection.closed
+
+    # Strict JSON, with NaN/inf as nulls that jsonb_strip_nulls removes
+    decoded = [json.loads(r['features'], parse_constant=_reject_constant) for r in records]
+    stripped = [{k: v for k, v in row.items() if v is not None} for row in decoded]
+    assert stripped == [
+        {'time': '2024-03-01T00:05:00.000Z', 'ph_stress_low': 1, 'is_weekend': False},
+        {
+            'time': '2024-03-01T00:10:00.000Z', 'temperature_mean_1H': 21.0,
+            'temp_oxygen_ratio_1H': 3.5, 'ph_stress_low': 0, 'is_weekend': True
+        },
+    ]
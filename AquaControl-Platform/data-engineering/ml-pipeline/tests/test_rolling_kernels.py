@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling_kernels import WINDOW_STATS, compute_all_stats
+
+WINDOW_SIZES = np.array([1, 3, 12, 36], dtype=np.int64)
+
+
+def _pandas_stats(x: np.ndarray, window: int) -> np.ndarray:
+    """WINDOW_STATS computed with pd.Series.rolling(window, min_periods=1)"""
+    rolling = pd.Series(x).rolling(window, min_periods=1)
+    mean, std = rolling.mean(), rolling.std()
+    low, high = rolling.min(), rolling.max()
+    q25, q75 = rolling.quantile(0.25), rolling.quantile(0.75)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.column_stack([
+            mean, std, low, high, high - low, q25, q75, q75 - q25, x - mean, std / mean
+        ])
+
+
+def _series():
+    rng = np.random.default_rng(0)
+    noisy = rng.normal(20, 2, 500)
+    gapped = noisy.copy()
+    gapped[rng.random(500) < 0.1] = np.nan
+    gapped[:20] = np.nan
+    gapped[200:260] = np.nan
+    return {
+        'constant': np.full(500, 7.5),
+        'zero': np.zeros(500),
+        'noisy': noisy,
+        'nan_gapped': gapped,
+    }
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+@pytest.mark.parametrize('name', list(_series()))
+def test_compute_all_stats_matches_pandas(name, dtype):
+    x = _series()[name].astype(dtype)
+    stats = compute_all_stats(np.ascontiguousarray(x[np.newaxis, :]), WINDOW_SIZES)
+
+    assert stats.shape == (1, len(x), len(WINDOW_SIZES), len(WINDOW_STATS))
+    assert stats.dtype == dtype
+
+    tol = 1e-4 if dtype == np.float32 else 1e-9
+    for j, window in enumerate(WINDOW_SIZES):
+        expected = _pandas_stats(x.astype(np.float64), int(window))
+        got = stats[0, :, j, :].astype(np.float64)
+        np.testing.assert_allclose(got, expected, rtol=tol, atol=tol, err_msg=f'window={window}')
+
+
+def test_zero_mean_window_gives_nan_cv():
+    stats = compute_all_stats(np.zeros((1, 50), dtype=np.float32), WINDOW_SIZES)
+
+    assert np.isnan(stats[..., WINDOW_STATS.index('cv')]).all()